@@ -24,7 +24,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, JSONResponse, Response
 
 # --- 内部模块导入 ---
-from modules.file_uploader import upload_to_file_bed
+from modules.file_uploader import upload_to_file_bed, close_client as close_file_bed_client
 from modules import dashboard_db as db
 from modules.worker_manager import WorkerManager
 from modules.request_queue import RequestQueue
@@ -416,9 +416,15 @@ async def lifespan(app: FastAPI):
         idle_monitor_thread = threading.Thread(target=idle_monitor, daemon=True)
         idle_monitor_thread.start()
         
+    # 初始化 dashboard 数据库（导入模块时不再自动建表）
+    db.init_database()
+    # 启动使用日志批量写入任务，避免每个请求单独提交一次数据库事务
+    db.start_log_writer()
 
     yield
     logger.info("服务器正在关闭。")
+    await db.stop_log_writer() # 写入队列中剩余的使用日志
+    await close_file_bed_client() # 关闭文件床上传共用的 HTTP 客户端
 
 app = FastAPI(lifespan=lifespan)
 
@@ -1025,7 +1031,7 @@ async def chat_completions(request: Request):
     # --- API Key / Token 验证 ---
     request_start_time = time.time()  # 记录请求开始时间，用于后续日志记录
     user_id = None
-    validated_token = None
+    validated_token_id = None
     
     auth_header = request.headers.get('Authorization')
     if auth_header and auth_header.startswith('Bearer '):
@@ -1033,9 +1039,9 @@ async def chat_completions(request: Request):
         
         # 首先尝试使用 dashboard token 系统验证
         if CONFIG.get("use_dashboard_tokens", True):
-            user_id = db.validate_api_token(provided_key)
-            if user_id:
-                validated_token = provided_key
+            token_info = db.validate_api_token(provided_key)
+            if token_info:
+                user_id, validated_token_id = token_info
                 logger.info(f"API CALL: Dashboard token 验证成功 (User ID: {user_id})")
         
         # 如果 dashboard token 验证失败，回退到简单 API key
@@ -1161,7 +1167,10 @@ async def chat_completions(request: Request):
                         file_name = original_filename or f"image_{uuid.uuid4()}.png"
                         
                         logger.info(f"文件床预处理：正在上传 '{file_name}'...")
-                        uploaded_filename, error_message = await upload_to_file_bed(file_name, base64_url, upload_url, api_key)
+                        uploaded_filename, error_message = await upload_to_file_bed(
+                            file_name, base64_url, upload_url, api_key,
+                            multipart=CONFIG.get("file_bed_multipart", False)
+                        )
 
                         if error_message:
                             raise IOError(f"文件床上传失败: {error_message}")
@@ -1216,11 +1225,11 @@ async def chat_completions(request: Request):
                     raise
                 finally:
                     # 记录使用日志（如果使用了 dashboard token）
-                    if validated_token and response_completed:
+                    if validated_token_id and response_completed:
                         response_time_ms = int((time.time() - request_start_time) * 1000)
                         try:
                             db.log_request(
-                                token_key=validated_token,
+                                token_id=validated_token_id,
                                 model_name=model_name or "unknown",
                                 endpoint="/v1/chat/completions",
                                 response_time_ms=response_time_ms,
@@ -1241,7 +1250,7 @@ async def chat_completions(request: Request):
             response = await non_stream_response(request_id, model_name or "default_model")
             
             # 记录使用日志（如果使用了 dashboard token）
-            if validated_token:
+            if validated_token_id:
                 response_time_ms = int((time.time() - request_start_time) * 1000)
                 status_code = response.status_code if hasattr(response, 'status_code') else 200
                 error_msg = None
@@ -1256,7 +1265,7 @@ async def chat_completions(request: Request):
                 
                 try:
                     db.log_request(
-                        token_key=validated_token,
+                        token_id=validated_token_id,
                         model_name=model_name or "unknown",
                         endpoint="/v1/chat/completions",
                         response_time_ms=response_time_ms,
@@ -4,15 +4,22 @@ LMArena Bridge Dashboard Server
 Provides web interface for token management and usage tracking.
 """
 
-from fastapi import FastAPI, HTTPException, Depends, Cookie, Response, Request
+from fastapi import FastAPI, HTTPException, Depends, Cookie, Response, Request, Query
 from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
+import gzip
+import orjson
 import uvicorn
 import logging
 import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 from modules import dashboard_db as db
@@ -21,7 +28,92 @@ from modules import dashboard_db as db
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="LMArena Bridge Dashboard", version="1.0.0")
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, which encodes straight to bytes."""
+    
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+class TTLCache:
+    """Small thread-safe in-process cache whose entries expire after `ttl` seconds."""
+    
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return the cached value, or None if missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            self.pop(key)
+            return None
+        return value
+    
+    def set(self, key, value):
+        """Store a value, evicting expired (then oldest) entries when full."""
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                for k in [k for k, (exp, _) in self._data.items() if exp <= now]:
+                    del self._data[k]
+                if len(self._data) >= self.maxsize:
+                    del self._data[next(iter(self._data))]
+            self._data[key] = (now + self.ttl, value)
+    
+    def pop(self, key):
+        """Drop a key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+# Usage summaries are polled by the dashboard and are stale within seconds anyway
+SUMMARY_CACHE_TTL = 30
+summary_cache = TTLCache(ttl=SUMMARY_CACHE_TTL)
+
+# Valid session_token -> user_id, so authenticated polls skip a SQL lookup.
+# Logout evicts locally; other worker processes may honour a revoked
+# session for at most SESSION_CACHE_TTL seconds.
+SESSION_CACHE_TTL = 60
+session_cache = TTLCache(ttl=SESSION_CACHE_TTL, maxsize=4096)
+
+# Frontend pages and the body served when a page is missing on disk
+PAGE_FALLBACKS = {
+    "login": "<h1>Frontend not found. Please build the frontend first.</h1>",
+    "dashboard": "<h1>Dashboard page not found.</h1>",
+    "tokens": "<h1>Tokens page not found.</h1>",
+    "analytics": "<h1>Analytics page not found.</h1>",
+}
+
+def load_pages() -> dict:
+    """Read the frontend HTML pages once so they can be served from memory."""
+    pages = {}
+    for name, fallback in PAGE_FALLBACKS.items():
+        try:
+            with open(f"frontend/{name}.html", "rb") as f:
+                pages[name] = f.read()
+        except FileNotFoundError:
+            pages[name] = fallback.encode()
+    return pages
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare the database and frontend pages on startup; release pooled connections on shutdown."""
+    db.init_database()
+    app.state.pages = load_pages()
+    app.state.pages_gz = {name: gzip.compress(body, 6) for name, body in app.state.pages.items()}
+    yield
+    db.close_pool()
+
+app = FastAPI(
+    title="LMArena Bridge Dashboard",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # CORS middleware
 app.add_middleware(
@@ -32,6 +124,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses such as the usage log list; cached pages are pre-gzipped
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="frontend"), name="static")
 
@@ -58,21 +153,34 @@ class TokenResponse(BaseModel):
     is_active: bool
     expires_at: Optional[str]
 
+# Dependency to borrow a pooled database connection
+def get_db():
+    """Yield a long-lived connection from the database pool."""
+    with db.get_conn() as conn:
+        yield conn
+
+# Handlers and dependencies that only call the synchronous db module are
+# plain `def` so FastAPI runs them in its threadpool instead of blocking
+# the event loop on SQLite I/O and password hashing.
+
 # Dependency to get current user from session cookie
-async def get_current_user(session_token: Optional[str] = Cookie(None)) -> int:
+def get_current_user(session_token: Optional[str] = Cookie(None)) -> int:
     """Validate session and return user_id."""
     if not session_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    user_id = db.validate_session(session_token)
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Invalid or expired session")
+    user_id = session_cache.get(session_token)
+    if user_id is None:
+        user_id = db.validate_session(session_token)
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Invalid or expired session")
+        session_cache.set(session_token, user_id)
     
     return user_id
 
 # Authentication endpoints
 @app.post("/api/auth/register")
-async def register(user: UserCreate):
+def register(user: UserCreate):
     """Register a new user account."""
     user_id = db.create_user(user.username, user.email, user.password)
     
@@ -83,7 +191,7 @@ async def register(user: UserCreate):
     return {"message": "User created successfully", "user_id": user_id}
 
 @app.post("/api/auth/login")
-async def login(user: UserLogin, response: Response):
+def login(user: UserLogin, response: Response):
     """Login and create a session."""
     user_data = db.authenticate_user(user.username, user.password)
     
@@ -114,19 +222,20 @@ async def login(user: UserLogin, response: Response):
     }
 
 @app.post("/api/auth/logout")
-async def logout(
+def logout(
     response: Response,
     session_token: Optional[str] = Cookie(None)
 ):
     """Logout and invalidate session."""
     if session_token:
+        session_cache.pop(session_token)
         db.invalidate_session(session_token)
     
     response.delete_cookie("session_token")
     return {"message": "Logged out successfully"}
 
 @app.get("/api/auth/me")
-async def get_current_user_info(user_id: int = Depends(get_current_user)):
+def get_current_user_info(user_id: int = Depends(get_current_user)):
     """Get current user information."""
     user = db.get_user_by_id(user_id)
     if not user:
@@ -136,13 +245,13 @@ async def get_current_user_info(user_id: int = Depends(get_current_user)):
 
 # Token management endpoints
 @app.get("/api/tokens")
-async def list_tokens(user_id: int = Depends(get_current_user)):
+def list_tokens(user_id: int = Depends(get_current_user)):
     """Get all API tokens for the current user."""
     tokens = db.get_user_tokens(user_id)
     return {"tokens": tokens}
 
 @app.post("/api/tokens")
-async def create_token(
+def create_token(
     token_data: TokenCreate,
     user_id: int = Depends(get_current_user)
 ):
@@ -161,7 +270,7 @@ async def create_token(
     }
 
 @app.delete("/api/tokens/{token_id}")
-async def revoke_token_endpoint(
+def revoke_token_endpoint(
     token_id: int,
     user_id: int = Depends(get_current_user)
 ):
@@ -176,41 +285,54 @@ async def revoke_token_endpoint(
 
 # Usage statistics endpoints
 @app.get("/api/usage/summary")
-async def get_usage_summary(
-    days: int = 30,
+def get_usage_summary(
+    days: int = Query(30, ge=1),
     user_id: int = Depends(get_current_user)
 ):
-    """Get usage statistics summary."""
-    stats = db.get_usage_stats(user_id, days)
+    """Get usage statistics summary (cached briefly per user and window)."""
+    stats = summary_cache.get((user_id, days))
+    if stats is None:
+        stats = db.get_usage_stats(user_id, days)
+        summary_cache.set((user_id, days), stats)
     return stats
 
+# Resolve the user's tokens first so the (token_id, request_time) index
+# drives both the filter and the ordering. Kept as one constant so every
+# call hits the connection's prepared-statement cache.
+USAGE_LOGS_SQL = """
+    WITH tks AS (
+        SELECT id, token_name FROM api_tokens WHERE user_id = ?
+    )
+    SELECT 
+        ul.model_name,
+        ul.endpoint,
+        ul.request_time,
+        ul.response_time_ms,
+        ul.status_code,
+        ul.tokens_used,
+        tks.token_name
+    FROM usage_logs ul
+    JOIN tks ON ul.token_id = tks.id
+    ORDER BY ul.request_time DESC
+    LIMIT ?
+"""
+MAX_USAGE_LOGS_LIMIT = 500
+
 @app.get("/api/usage/logs")
-async def get_usage_logs(
+def get_usage_logs(
     limit: int = 100,
-    user_id: int = Depends(get_current_user)
+    user_id: int = Depends(get_current_user),
+    conn: sqlite3.Connection = Depends(get_db)
 ):
     """Get recent usage logs."""
-    conn = db.get_db_connection()
     cursor = conn.cursor()
+    cursor.row_factory = None  # plain tuples; column names are zipped in once below
+    
+    limit = min(max(limit, 1), MAX_USAGE_LOGS_LIMIT)
+    cursor.execute(USAGE_LOGS_SQL, (user_id, limit))
     
-    cursor.execute("""
-        SELECT 
-            ul.model_name,
-            ul.endpoint,
-            ul.request_time,
-            ul.response_time_ms,
-            ul.status_code,
-            ul.tokens_used,
-            at.token_name
-        FROM usage_logs ul
-        JOIN api_tokens at ON ul.token_id = at.id
-        WHERE at.user_id = ?
-        ORDER BY ul.request_time DESC
-        LIMIT ?
-    """, (user_id, limit))
-    
-    logs = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    cols = [d[0] for d in cursor.description]
+    logs = [dict(zip(cols, row)) for row in cursor.fetchall()]
     
     return {"logs": logs}
 
@@ -226,53 +348,44 @@ async def get_system_status():
     }
 
 # Serve frontend pages
+def page_response(request: Request, name: str) -> HTMLResponse:
+    """Return a cached frontend page, pre-gzipped when the client accepts it."""
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return HTMLResponse(
+            content=request.app.state.pages_gz[name],
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+        )
+    return HTMLResponse(content=request.app.state.pages[name])
+
 @app.get("/", response_class=HTMLResponse)
-async def serve_login_page():
+async def serve_login_page(request: Request):
     """Serve the login page."""
-    try:
-        with open("frontend/login.html", "r") as f:
-            return HTMLResponse(content=f.read())
-    except FileNotFoundError:
-        return HTMLResponse(content="<h1>Frontend not found. Please build the frontend first.</h1>")
+    return page_response(request, "login")
 
 @app.get("/dashboard", response_class=HTMLResponse)
-async def serve_dashboard_page(user_id: int = Depends(get_current_user)):
+async def serve_dashboard_page(request: Request, user_id: int = Depends(get_current_user)):
     """Serve the dashboard page (requires authentication)."""
-    try:
-        with open("frontend/dashboard.html", "r") as f:
-            return HTMLResponse(content=f.read())
-    except FileNotFoundError:
-        return HTMLResponse(content="<h1>Dashboard page not found.</h1>")
+    return page_response(request, "dashboard")
 
 @app.get("/tokens", response_class=HTMLResponse)
-async def serve_tokens_page(user_id: int = Depends(get_current_user)):
+async def serve_tokens_page(request: Request, user_id: int = Depends(get_current_user)):
     """Serve the tokens management page."""
-    try:
-        with open("frontend/tokens.html", "r") as f:
-            return HTMLResponse(content=f.read())
-    except FileNotFoundError:
-        return HTMLResponse(content="<h1>Tokens page not found.</h1>")
+    return page_response(request, "tokens")
 
 @app.get("/analytics", response_class=HTMLResponse)
-async def serve_analytics_page(user_id: int = Depends(get_current_user)):
+async def serve_analytics_page(request: Request, user_id: int = Depends(get_current_user)):
     """Serve the analytics page."""
-    try:
-        with open("frontend/analytics.html", "r") as f:
-            return HTMLResponse(content=f.read())
-    except FileNotFoundError:
-        return HTMLResponse(content="<h1>Analytics page not found.</h1>")
+    return page_response(request, "analytics")
 
 # Utility endpoint to create first admin user
 @app.post("/api/admin/init")
-async def create_first_admin(user: UserCreate):
+def create_first_admin(user: UserCreate, conn: sqlite3.Connection = Depends(get_db)):
     """Create the first admin user (only works if no users exist)."""
-    conn = db.get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) as count FROM users")
-    user_count = cursor.fetchone()['count']
-    conn.close()
+    cursor.execute("SELECT 1 FROM users LIMIT 1")
+    users_exist = cursor.fetchone() is not None
     
-    if user_count > 0:
+    if users_exist:
         raise HTTPException(status_code=400, detail="Admin user already exists")
     
     user_id = db.create_user(user.username, user.email, user.password, is_admin=True)
@@ -302,13 +415,12 @@ def create_admin_from_env():
         return
     
     # Check if any users exist
-    conn = db.get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) as count FROM users")
-    user_count = cursor.fetchone()['count']
-    conn.close()
+    with db.get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM users LIMIT 1")
+        users_exist = cursor.fetchone() is not None
     
-    if user_count > 0:
+    if users_exist:
         logger.info("Users already exist, skipping admin creation from environment")
         return
     
@@ -328,4 +440,13 @@ if __name__ == "__main__":
     # Try to create admin user from environment variables
     create_admin_from_env()
     
-    uvicorn.run(app, host="0.0.0.0", port=5105)
+    # loop/http "auto" pick uvloop and httptools when uvicorn[standard] provides them
+    # (uvloop is unavailable on Windows). Multiple workers need the import string.
+    uvicorn.run(
+        "dashboard_server:app",
+        host="0.0.0.0",
+        port=5105,
+        loop="auto",
+        http="auto",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+    )
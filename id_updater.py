@@ -4,19 +4,30 @@
 # from the Tampermonkey script based on the user's selected mode
 # (DirectChat or Battle) and updates it to the config.jsonc file.
 
-import http.server
-import socketserver
 import json
 import re
-import threading
 import os
+from functools import lru_cache
+import orjson
 import requests
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 # --- Configuration ---
 HOST = "127.0.0.1"
 PORT = 5103
 CONFIG_PATH = 'config.jsonc'
 
+# String literals are matched first and kept, so "//" or "/*" inside a value
+# (URLs, paths) is never mistaken for a comment.
+_JSONC_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|//[^\n]*|/\*.*?(?:\*/|$)', re.DOTALL)
+
+def _strip_comment(match):
+    token = match.group(0)
+    return token if token.startswith('"') else ''
+
 def read_config():
     """Read and parse config.jsonc file, removing comments for parsing."""
     if not os.path.exists(CONFIG_PATH):
@@ -24,43 +35,21 @@ def read_config():
         return None
     try:
         with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        # More robustly remove comments, processing line by line to avoid incorrectly deleting "//" in URLs
-        no_comments_lines = []
-        in_block_comment = False
-        for line in lines:
-            stripped_line = line.strip()
-            if in_block_comment:
-                if '*/' in stripped_line:
-                    in_block_comment = False
-                    line = stripped_line.split('*/', 1)[1]
-                else:
-                    continue
-            
-            if '/*' in line and not in_block_comment:
-                before_comment, _, after_comment = line.partition('/*')
-                if '*/' in after_comment:
-                    _, _, after_block = after_comment.partition('*/')
-                    line = before_comment + after_block
-                else:
-                    line = before_comment
-                    in_block_comment = True
-
-            if line.strip().startswith('//'):
-                continue
-            
-            no_comments_lines.append(line)
-
-        json_content = "".join(no_comments_lines)
-        return json.loads(json_content)
+            content = f.read()
+        return json.loads(_JSONC_TOKEN_RE.sub(_strip_comment, content))
     except Exception as e:
         print(f"❌ Error occurred while reading or parsing '{CONFIG_PATH}': {e}")
         return None
 
-def save_config_value(key, value):
+@lru_cache(maxsize=64)
+def _kv_re(key):
+    """Compiled pattern matching `"key": "value"` for a string-valued config key."""
+    return re.compile(rf'("{re.escape(key)}"\s*:\s*")[^"]*(")')
+
+def save_config_values(pairs):
     """
-    Safely update a single key-value pair in config.jsonc, preserving original format and comments.
+    Safely update several key-value pairs in config.jsonc with a single read and write,
+    preserving original format and comments.
     Only applicable for values that are strings or numbers.
     """
     try:
@@ -69,26 +58,29 @@ def save_config_value(key, value):
 
         # Use regex to safely replace values
         # It will find "key": "any value" and replace "any value"
-        pattern = re.compile(rf'("{key}"\s*:\s*")[^"]*(")')
-        new_content, count = pattern.subn(rf'\g<1>{value}\g<2>', content, 1)
-
-        if count == 0:
-            print(f"🤔 Warning: Could not find key '{key}' in '{CONFIG_PATH}'.")
-            return False
-
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        return True
+        replaced = 0
+        for key, value in pairs.items():
+            content, count = _kv_re(key).subn(lambda m: f'{m.group(1)}{value}{m.group(2)}', content, 1)
+            if count == 0:
+                print(f"🤔 Warning: Could not find key '{key}' in '{CONFIG_PATH}'.")
+            replaced += count
+
+        if replaced:
+            with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
+                f.write(content)
+        return replaced == len(pairs)
     except Exception as e:
         print(f"❌ Error occurred while updating '{CONFIG_PATH}': {e}")
         return False
 
+def save_config_value(key, value):
+    """Safely update a single key-value pair in config.jsonc."""
+    return save_config_values({key: value})
+
 def save_session_ids(session_id, message_id):
     """Update new session IDs to config.jsonc file."""
     print(f"\n📝 Attempting to write IDs to '{CONFIG_PATH}'...")
-    res1 = save_config_value("session_id", session_id)
-    res2 = save_config_value("message_id", message_id)
-    if res1 and res2:
+    if save_config_values({"session_id": session_id, "message_id": message_id}):
         print(f"✅ Successfully updated IDs.")
         print(f"   - session_id: {session_id}")
         print(f"   - message_id: {message_id}")
@@ -96,71 +88,53 @@ def save_session_ids(session_id, message_id):
         print(f"❌ Failed to update IDs. Please check the error messages above.")
 
 
-class RequestHandler(http.server.SimpleHTTPRequestHandler):
-    def _send_cors_headers(self):
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-
-    def do_OPTIONS(self):
-        self.send_response(204)
-        self._send_cors_headers()
-        self.end_headers()
-
-    def do_POST(self):
-        if self.path == '/update':
-            try:
-                content_length = int(self.headers['Content-Length'])
-                post_data = self.rfile.read(content_length)
-                data = json.loads(post_data)
-
-                session_id = data.get('sessionId')
-                message_id = data.get('messageId')
-
-                if session_id and message_id:
-                    print("\n" + "=" * 50)
-                    print("🎉 Successfully captured IDs from browser!")
-                    print(f"  - Session ID: {session_id}")
-                    print(f"  - Message ID: {message_id}")
-                    print("=" * 50)
-
-                    save_session_ids(session_id, message_id)
-
-                    self.send_response(200)
-                    self._send_cors_headers()
-                    self.end_headers()
-                    self.wfile.write(b'{"status": "success"}')
-
-                    print("\nTask complete, server will automatically close in 1 second.")
-                    threading.Thread(target=self.server.shutdown).start()
-
-                else:
-                    self.send_response(400, "Bad Request")
-                    self._send_cors_headers()
-                    self.end_headers()
-                    self.wfile.write(b'{"error": "Missing sessionId or messageId"}')
-            except Exception as e:
-                self.send_response(500, "Internal Server Error")
-                self._send_cors_headers()
-                self.end_headers()
-                self.wfile.write(f'{{"error": "Internal server error: {e}"}}'.encode('utf-8'))
-        else:
-            self.send_response(404, "Not Found")
-            self._send_cors_headers()
-            self.end_headers()
+app = FastAPI()
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["POST", "OPTIONS"],
+    allow_headers=["Content-Type"],
+)
+
+# Set by run_server(); the update handler flags it to stop after one capture.
+server: uvicorn.Server | None = None
+
+@app.post("/update")
+async def update_ids(request: Request):
+    """Receive captured IDs from the Tampermonkey script and save them to config.jsonc."""
+    try:
+        data = orjson.loads(await request.body())
+
+        session_id = data.get('sessionId')
+        message_id = data.get('messageId')
 
-    def log_message(self, format, *args):
-        return
+        if not (session_id and message_id):
+            return JSONResponse(status_code=400, content={"error": "Missing sessionId or messageId"})
+
+        print("\n" + "=" * 50)
+        print("🎉 Successfully captured IDs from browser!")
+        print(f"  - Session ID: {session_id}")
+        print(f"  - Message ID: {message_id}")
+        print("=" * 50)
+
+        save_session_ids(session_id, message_id)
+
+        print("\nTask complete, server will automatically close in 1 second.")
+        server.should_exit = True
+        return {"status": "success"}
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": f"Internal server error: {e}"})
 
 def run_server():
-    with socketserver.TCPServer((HOST, PORT), RequestHandler) as httpd:
-        print("\n" + "="*50)
-        print("  🚀 Session ID Update Listener Started")
-        print(f"  - Listening on: http://{HOST}:{PORT}")
-        print("  - Please operate LMArena page in browser to trigger ID capture.")
-        print("  - After successful capture, this script will automatically close.")
-        print("="*50)
-        httpd.serve_forever()
+    global server
+    server = uvicorn.Server(uvicorn.Config(app, host=HOST, port=PORT, log_level="error"))
+    print("\n" + "="*50)
+    print("  🚀 Session ID Update Listener Started")
+    print(f"  - Listening on: http://{HOST}:{PORT}")
+    print("  - Please operate LMArena page in browser to trigger ID capture.")
+    print("  - After successful capture, this script will automatically close.")
+    print("="*50)
+    server.run()
 
 def notify_api_server():
     """Notify the main API server that the ID update process has started."""
@@ -201,7 +175,7 @@ if __name__ == "__main__":
             print(f"Invalid input, using default value: {last_mode}")
             mode = last_mode
 
-    save_config_value("id_updater_last_mode", mode)
+    updates = {"id_updater_last_mode": mode}
     print(f"Current mode: {mode.upper()}")
     
     if mode == 'battle':
@@ -217,10 +191,12 @@ if __name__ == "__main__":
             print(f"Invalid input, using default value: {last_target}")
             target = last_target
         
-        save_config_value("id_updater_battle_target", target)
+        updates["id_updater_battle_target"] = target
         print(f"Battle target: Assistant {target}")
         print("Note: Regardless of selecting A or B, captured IDs will update the main session_id and message_id.")
 
+    save_config_values(updates)
+
     # Notify main server before starting listener
     if notify_api_server():
         run_server()
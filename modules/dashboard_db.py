@@ -4,23 +4,103 @@ Database models and operations for the LMArena Bridge dashboard.
 Handles users, API tokens, and usage tracking.
 """
 
+import asyncio
+import base64
+import logging
+import os
 import sqlite3
-import secrets
 import hashlib
+import hmac
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import json
 
-DATABASE_PATH = "dashboard.db"
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
+logger = logging.getLogger(__name__)
+
+DATABASE_PATH = os.getenv("DASHBOARD_DB_PATH", "dashboard.db")
+POOL_SIZE = 8
+CONN_MAX_LIFETIME = 300  # seconds before a pooled connection is recycled
+
+# Applied once per connection; pooled connections keep them for their lifetime.
+# WAL lets dashboard readers run alongside the API server's writes, and
+# busy_timeout makes a writer wait for the lock instead of failing immediately.
+# foreign_keys enables the ON DELETE CASCADE clauses declared in the schema.
+CONNECTION_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "wal_autocheckpoint=1000",
+    "busy_timeout=5000",
+    "foreign_keys=ON",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+    "cache_size=-65536",
+)
+
+# Idle (connection, created_at) pairs kept open between requests so the file
+# handle, statement cache and SQLite page cache survive across calls.
+_pool: "queue.LifoQueue[tuple[sqlite3.Connection, float]]" = queue.LifoQueue(maxsize=POOL_SIZE)
 
 def get_db_connection():
     """Create a database connection."""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma}")
     return conn
 
+@contextmanager
+def get_conn():
+    """Borrow a connection from the pool, returning it when done."""
+    if not _initialized:
+        init_database()
+    conn = None
+    while conn is None:
+        try:
+            conn, created_at = _pool.get_nowait()
+        except queue.Empty:
+            conn, created_at = get_db_connection(), time.monotonic()
+            break
+        if time.monotonic() - created_at > CONN_MAX_LIFETIME:
+            conn.close()
+            conn = None
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            _pool.put_nowait((conn, created_at))
+        except queue.Full:
+            conn.close()
+
+def close_pool():
+    """Close all idle pooled connections."""
+    while True:
+        try:
+            _pool.get_nowait()[0].close()
+        except queue.Empty:
+            break
+
+_initialized = False
+_init_lock = threading.Lock()
+
 def init_database():
-    """Initialize the database with required tables."""
+    """Initialize the database with required tables (once per process)."""
+    global _initialized
+    with _init_lock:
+        if not _initialized:
+            _create_schema()
+            _initialized = True
+
+def _create_schema():
+    """Create tables, triggers and indexes if they don't exist yet."""
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -81,87 +161,224 @@ def init_database():
         )
     """)
     
+    # Daily per-user, per-model rollup of usage_logs, kept current by a trigger
+    # so the summary endpoint reads O(days) rows instead of the raw log.
+    # The check, DDL and backfill share one write transaction so a second
+    # process starting at the same time, or a log insert landing between the
+    # trigger and the backfill, cannot double-count or fail the migration.
+    conn.commit()
+    cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'usage_daily'")
+    needs_backfill = cursor.fetchone() is None
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usage_daily (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            model_name TEXT NOT NULL DEFAULT '',
+            requests INTEGER NOT NULL DEFAULT 0,
+            tokens INTEGER NOT NULL DEFAULT 0,
+            total_latency INTEGER NOT NULL DEFAULT 0,
+            latency_samples INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day, model_name)
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_usage_logs_daily
+        AFTER INSERT ON usage_logs
+        BEGIN
+            INSERT INTO usage_daily
+                (user_id, day, model_name, requests, tokens, total_latency, latency_samples)
+            SELECT at.user_id, DATE(NEW.request_time), COALESCE(NEW.model_name, ''), 1,
+                   COALESCE(NEW.tokens_used, 0), COALESCE(NEW.response_time_ms, 0),
+                   NEW.response_time_ms IS NOT NULL
+            FROM api_tokens at
+            WHERE at.id = NEW.token_id
+            ON CONFLICT (user_id, day, model_name) DO UPDATE SET
+                requests = requests + 1,
+                tokens = tokens + excluded.tokens,
+                total_latency = total_latency + excluded.total_latency,
+                latency_samples = latency_samples + excluded.latency_samples;
+        END
+    """)
+    if needs_backfill:
+        cursor.execute("""
+            INSERT INTO usage_daily
+                (user_id, day, model_name, requests, tokens, total_latency, latency_samples)
+            SELECT at.user_id, DATE(ul.request_time), COALESCE(ul.model_name, ''), COUNT(*),
+                   COALESCE(SUM(ul.tokens_used), 0), COALESCE(SUM(ul.response_time_ms), 0),
+                   COUNT(ul.response_time_ms)
+            FROM usage_logs ul
+            JOIN api_tokens at ON ul.token_id = at.id
+            GROUP BY at.user_id, DATE(ul.request_time), COALESCE(ul.model_name, '')
+            ON CONFLICT (user_id, day, model_name) DO UPDATE SET
+                requests = requests + excluded.requests,
+                tokens = tokens + excluded.tokens,
+                total_latency = total_latency + excluded.total_latency,
+                latency_samples = latency_samples + excluded.latency_samples
+        """)
+    conn.commit()
+    
+    # Indexes for per-user usage log queries
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_usage_logs_token_time ON usage_logs(token_id, request_time DESC)"
+    )
+    # (user_id, created_at) lets get_user_tokens read rows already in order.
+    # token_key and session_token lookups use their UNIQUE autoindexes.
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_api_tokens_user_created ON api_tokens(user_id, created_at DESC)"
+    )
+    
+    # Refresh planner statistics; analysis_limit keeps this cheap on big tables
+    cursor.execute("PRAGMA analysis_limit = 1000")
+    cursor.execute("ANALYZE")
+    
     conn.commit()
     conn.close()
 
+# Argon2id parameters: 64 MiB, 3 passes, 2 lanes (~100ms per hash on a
+# typical server core).
+_password_hasher = PasswordHasher(time_cost=3, memory_cost=65536, parallelism=2)
+
 def hash_password(password: str) -> str:
-    """Hash a password using SHA-256 with salt."""
-    salt = secrets.token_hex(16)
-    pwd_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-    return f"{salt}${pwd_hash}"
+    """Hash a password using Argon2id."""
+    return _password_hasher.hash(password)
 
 def verify_password(password: str, hashed: str) -> bool:
-    """Verify a password against its hash."""
+    """Verify a password against its hash.
+
+    Legacy ``salt$sha256hex`` hashes are still accepted so existing users can
+    log in; authenticate_user rehashes them on success.
+    """
+    if hashed.startswith('$argon2'):
+        try:
+            return _password_hasher.verify(hashed, password)
+        except (VerificationError, InvalidHashError):
+            return False
     try:
         salt, pwd_hash = hashed.split('$')
-        test_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-        return test_hash == pwd_hash
-    except:
+    except ValueError:
         return False
+    test_hash = hashlib.sha256((password + salt).encode()).hexdigest()
+    return hmac.compare_digest(test_hash, pwd_hash)
+
+def password_needs_rehash(hashed: str) -> bool:
+    """Return True if the hash is legacy or uses outdated Argon2 parameters."""
+    if not hashed.startswith('$argon2'):
+        return True
+    try:
+        return _password_hasher.check_needs_rehash(hashed)
+    except InvalidHashError:
+        return True
+
+# Random bytes are read from os.urandom in RNG_CHUNK_SIZE blocks and handed
+# out in slices, so bulk token creation doesn't make one syscall per token.
+RNG_CHUNK_SIZE = 4096
+
+_rng_lock = threading.Lock()
+_rng_buffer = bytearray()
+
+def _reset_rng_buffer():
+    """Drop buffered bytes so a forked worker never reuses the parent's."""
+    global _rng_lock
+    _rng_lock = threading.Lock()
+    _rng_buffer.clear()
+
+if hasattr(os, "register_at_fork"):  # not available on Windows
+    os.register_at_fork(after_in_child=_reset_rng_buffer)
+
+def _token_urlsafe(nbytes: int) -> str:
+    """Equivalent of secrets.token_urlsafe backed by the buffered urandom pool."""
+    with _rng_lock:
+        if len(_rng_buffer) < nbytes:
+            _rng_buffer.extend(os.urandom(max(RNG_CHUNK_SIZE, nbytes)))
+        chunk = bytes(_rng_buffer[:nbytes])
+        del _rng_buffer[:nbytes]
+    return base64.urlsafe_b64encode(chunk).rstrip(b'=').decode('ascii')
 
 def generate_api_key() -> str:
     """Generate a secure API key."""
-    return f"sk-lmarena-{secrets.token_urlsafe(32)}"
+    return f"sk-lmarena-{_token_urlsafe(32)}"
 
 def generate_session_token() -> str:
     """Generate a secure session token."""
-    return secrets.token_urlsafe(48)
+    return _token_urlsafe(48)
 
 # User operations
 def create_user(username: str, email: str, password: str, is_admin: bool = False) -> Optional[int]:
     """Create a new user account."""
+    password_hash = hash_password(password)
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        password_hash = hash_password(password)
-        cursor.execute(
-            "INSERT INTO users (username, email, password_hash, is_admin) VALUES (?, ?, ?, ?)",
-            (username, email, password_hash, is_admin)
-        )
-        
-        user_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return user_id
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO users (username, email, password_hash, is_admin) VALUES (?, ?, ?, ?)",
+                (username, email, password_hash, is_admin)
+            )
+            
+            user_id = cursor.lastrowid
+            conn.commit()
+            return user_id
     except sqlite3.IntegrityError:
         return None
 
-def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
-    """Authenticate a user and return user info."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-    user = cursor.fetchone()
-    
-    if user and verify_password(password, user['password_hash']):
-        # Update last login
-        cursor.execute(
-            "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?",
-            (user['id'],)
+def create_users_bulk(users: List[tuple]) -> int:
+    """
+    Create many users in one transaction.
+    
+    Each entry is (username, email, password, is_admin). Rows whose username or
+    email already exists are skipped. Returns the number of users created.
+    """
+    rows = [
+        (username, email, hash_password(password), is_admin)
+        for username, email, password, is_admin in users
+    ]
+    with get_conn() as conn:
+        cursor = conn.executemany(
+            "INSERT OR IGNORE INTO users (username, email, password_hash, is_admin) VALUES (?, ?, ?, ?)",
+            rows
         )
+        created = cursor.rowcount
         conn.commit()
-        conn.close()
+    return created
+
+def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
+    """Authenticate a user and return user info."""
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
+        user = cursor.fetchone()
         
-        return {
-            'id': user['id'],
-            'username': user['username'],
-            'email': user['email'],
-            'is_admin': bool(user['is_admin'])
-        }
+        if user and verify_password(password, user['password_hash']):
+            # Upgrade legacy/outdated hashes now that we have the plaintext
+            if password_needs_rehash(user['password_hash']):
+                cursor.execute(
+                    "UPDATE users SET password_hash = ? WHERE id = ?",
+                    (hash_password(password), user['id'])
+                )
+            
+            # Update last login
+            cursor.execute(
+                "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?",
+                (user['id'],)
+            )
+            conn.commit()
+            
+            return {
+                'id': user['id'],
+                'username': user['username'],
+                'email': user['email'],
+                'is_admin': bool(user['is_admin'])
+            }
     
-    conn.close()
     return None
 
 def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     """Get user information by ID."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT id, username, email, is_admin, created_at FROM users WHERE id = ?", (user_id,))
-    user = cursor.fetchone()
-    conn.close()
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, username, email, is_admin, created_at FROM users WHERE id = ?", (user_id,))
+        user = cursor.fetchone()
     
     if user:
         return dict(user)
@@ -170,201 +387,308 @@ def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
 # Session operations
 def create_session(user_id: int) -> str:
     """Create a new session for a user."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     session_token = generate_session_token()
     expires_at = datetime.now() + timedelta(days=7)  # 7 days expiry
     
-    cursor.execute(
-        "INSERT INTO sessions (user_id, session_token, expires_at) VALUES (?, ?, ?)",
-        (user_id, session_token, expires_at)
-    )
-    
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        conn.execute(
+            "INSERT INTO sessions (user_id, session_token, expires_at) VALUES (?, ?, ?)",
+            (user_id, session_token, expires_at)
+        )
+        conn.commit()
     return session_token
 
 def validate_session(session_token: str) -> Optional[int]:
     """Validate a session token and return user_id if valid."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT user_id FROM sessions 
-        WHERE session_token = ? 
-        AND is_active = 1 
-        AND expires_at > CURRENT_TIMESTAMP
-    """, (session_token,))
-    
-    result = cursor.fetchone()
-    conn.close()
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT user_id FROM sessions 
+            WHERE session_token = ? 
+            AND is_active = 1 
+            AND expires_at > CURRENT_TIMESTAMP
+        """, (session_token,))
+        result = cursor.fetchone()
     
     return result['user_id'] if result else None
 
 def invalidate_session(session_token: str):
     """Invalidate a session."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "UPDATE sessions SET is_active = 0 WHERE session_token = ?",
-        (session_token,)
-    )
-    
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        conn.execute(
+            "UPDATE sessions SET is_active = 0 WHERE session_token = ?",
+            (session_token,)
+        )
+        conn.commit()
 
 # Token operations
 def create_api_token(user_id: int, token_name: str, expires_days: Optional[int] = None) -> str:
     """Create a new API token for a user."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     token_key = generate_api_key()
     expires_at = None
     if expires_days:
         expires_at = datetime.now() + timedelta(days=expires_days)
     
-    cursor.execute(
-        "INSERT INTO api_tokens (user_id, token_key, token_name, expires_at) VALUES (?, ?, ?, ?)",
-        (user_id, token_key, token_name, expires_at)
-    )
-    
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        conn.execute(
+            "INSERT INTO api_tokens (user_id, token_key, token_name, expires_at) VALUES (?, ?, ?, ?)",
+            (user_id, token_key, token_name, expires_at)
+        )
+        conn.commit()
     return token_key
 
 def get_user_tokens(user_id: int) -> List[Dict[str, Any]]:
     """Get all tokens for a user."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT id, token_key, token_name, created_at, last_used_at, is_active, expires_at
-        FROM api_tokens 
-        WHERE user_id = ? 
-        ORDER BY created_at DESC
-    """, (user_id,))
-    
-    tokens = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, token_key, token_name, created_at, last_used_at, is_active, expires_at
+            FROM api_tokens 
+            WHERE user_id = ? 
+            ORDER BY created_at DESC
+        """, (user_id,))
+        
+        tokens = [dict(row) for row in cursor.fetchall()]
     return tokens
 
-def validate_api_token(token_key: str) -> Optional[int]:
-    """Validate an API token and return user_id if valid."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT user_id, id FROM api_tokens 
-        WHERE token_key = ? 
-        AND is_active = 1 
-        AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
-    """, (token_key,))
-    
-    result = cursor.fetchone()
-    
-    if result:
-        # Update last_used_at
-        cursor.execute(
-            "UPDATE api_tokens SET last_used_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (result['id'],)
+# API token validation cache: token_key -> (user_id, token_id, expires_ts, cached_at).
+# Revocations in another process (e.g. the dashboard) take effect within
+# TOKEN_CACHE_TTL seconds.
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_MAXSIZE = 4096
+LAST_USED_INTERVAL = 60  # seconds between last_used_at writes per token
+
+_token_lock = threading.Lock()
+_token_cache: Dict[str, tuple] = {}
+_last_used_touched: Dict[int, float] = {}
+_last_used_pending: Dict[int, str] = {}
+
+def _touch_token(token_id: int):
+    """Record a token use, writing last_used_at at most once per LAST_USED_INTERVAL."""
+    now = time.monotonic()
+    with _token_lock:
+        if now - _last_used_touched.get(token_id, float('-inf')) < LAST_USED_INTERVAL:
+            return
+        _last_used_touched[token_id] = now
+        _last_used_pending[token_id] = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+    if _log_queue is None:
+        with get_conn() as conn:
+            _flush_last_used(conn)
+            conn.commit()
+
+def _flush_last_used(conn: sqlite3.Connection):
+    """Write pending last_used_at updates; the caller commits."""
+    global _last_used_pending
+    with _token_lock:
+        pending, _last_used_pending = _last_used_pending, {}
+    if pending:
+        conn.executemany(
+            "UPDATE api_tokens SET last_used_at = ? WHERE id = ?",
+            [(used_at, token_id) for token_id, used_at in pending.items()]
         )
-        conn.commit()
-        conn.close()
-        return result['user_id']
+
+def validate_api_token(token_key: str) -> Optional[Tuple[int, int]]:
+    """Validate an API token and return (user_id, token_id) if valid."""
+    now = time.time()
+    with _token_lock:
+        entry = _token_cache.get(token_key)
+    if entry is not None:
+        user_id, token_id, expires_ts, cached_at = entry
+        if now - cached_at < TOKEN_CACHE_TTL and (expires_ts is None or expires_ts > now):
+            _touch_token(token_id)
+            return user_id, token_id
+    
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT user_id, id, CAST(strftime('%s', expires_at) AS INTEGER) as expires_ts
+            FROM api_tokens 
+            WHERE token_key = ? 
+            AND is_active = 1 
+            AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
+        """, (token_key,))
+        result = cursor.fetchone()
+    
+    if not result:
+        with _token_lock:
+            _token_cache.pop(token_key, None)
+        return None
     
-    conn.close()
-    return None
+    with _token_lock:
+        if len(_token_cache) >= TOKEN_CACHE_MAXSIZE:
+            _token_cache.clear()
+        _token_cache[token_key] = (result['user_id'], result['id'], result['expires_ts'], now)
+    _touch_token(result['id'])
+    return result['user_id'], result['id']
 
 def revoke_token(token_id: int, user_id: int) -> bool:
     """Revoke a token (only if it belongs to the user)."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "UPDATE api_tokens SET is_active = 0 WHERE id = ? AND user_id = ?",
-        (token_id, user_id)
-    )
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE api_tokens SET is_active = 0 WHERE id = ? AND user_id = ?",
+            (token_id, user_id)
+        )
+        
+        success = cursor.rowcount > 0
+        conn.commit()
     
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+    if success:
+        with _token_lock:
+            for key in [k for k, v in _token_cache.items() if v[1] == token_id]:
+                del _token_cache[key]
     return success
 
 # Usage logging
-def log_request(token_key: str, model_name: str, endpoint: str, 
+LOG_BATCH_SIZE = 100
+LOG_FLUSH_INTERVAL = 0.5  # seconds
+LOG_QUEUE_MAXSIZE = 10000  # oldest rows are dropped beyond this
+
+# Set while the batched writer task is running; log_request enqueues onto it.
+_log_queue: Optional[asyncio.Queue] = None
+_log_writer_task: Optional[asyncio.Task] = None
+
+_INSERT_LOG_SQL = """
+    INSERT INTO usage_logs 
+    (token_id, model_name, endpoint, response_time_ms, status_code, tokens_used, error_message)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+def _write_log_batch(rows: List[tuple]):
+    """Insert usage log rows in one transaction."""
+    with get_conn() as conn:
+        try:
+            conn.executemany(_INSERT_LOG_SQL, rows)
+        except sqlite3.IntegrityError:
+            # A token deleted while its rows were queued fails the foreign key
+            # check and the whole batch; retry row by row to keep the rest.
+            conn.rollback()
+            for row in rows:
+                try:
+                    conn.execute(_INSERT_LOG_SQL, row)
+                except sqlite3.IntegrityError as e:
+                    logger.warning(f"Dropped usage log row for token {row[0]}: {e}")
+        _flush_last_used(conn)
+        conn.commit()
+
+def _enqueue_log(log_queue: asyncio.Queue, item):
+    """Put onto the bounded log queue, dropping the oldest row if it is full."""
+    try:
+        log_queue.put_nowait(item)
+    except asyncio.QueueFull:
+        log_queue.get_nowait()
+        log_queue.put_nowait(item)
+        logger.warning("Usage log queue full; dropped the oldest row")
+
+def log_request(token_id: int, model_name: str, endpoint: str, 
                 response_time_ms: int, status_code: int, 
                 tokens_used: int = 0, error_message: str = None):
-    """Log an API request."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get token_id from token_key
-    cursor.execute("SELECT id FROM api_tokens WHERE token_key = ?", (token_key,))
-    result = cursor.fetchone()
-    
-    if result:
-        cursor.execute("""
-            INSERT INTO usage_logs 
-            (token_id, model_name, endpoint, response_time_ms, status_code, tokens_used, error_message)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (result['id'], model_name, endpoint, response_time_ms, status_code, tokens_used, error_message))
-        
-        conn.commit()
-    
-    conn.close()
+    """
+    Log an API request.
+    
+    While the batched writer is running this only enqueues the row and must be
+    called from the event loop thread; otherwise the row is written immediately.
+    """
+    row = (token_id, model_name, endpoint, response_time_ms, status_code, tokens_used, error_message)
+    if _log_queue is not None:
+        _enqueue_log(_log_queue, row)
+    else:
+        _write_log_batch([row])
 
-def get_usage_stats(user_id: int, days: int = 30) -> Dict[str, Any]:
-    """Get usage statistics for a user."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    since_date = datetime.now() - timedelta(days=days)
-    
-    # Total requests
-    cursor.execute("""
-        SELECT COUNT(*) as total_requests
-        FROM usage_logs ul
-        JOIN api_tokens at ON ul.token_id = at.id
-        WHERE at.user_id = ? AND ul.request_time > ?
-    """, (user_id, since_date))
-    total_requests = cursor.fetchone()['total_requests']
-    
-    # Requests by model
-    cursor.execute("""
-        SELECT model_name, COUNT(*) as count
-        FROM usage_logs ul
-        JOIN api_tokens at ON ul.token_id = at.id
-        WHERE at.user_id = ? AND ul.request_time > ?
+async def _log_writer(log_queue: asyncio.Queue):
+    """Drain queued usage logs, writing up to LOG_BATCH_SIZE rows per LOG_FLUSH_INTERVAL."""
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        row = await log_queue.get()
+        if row is None:
+            break
+        batch = [row]
+        deadline = loop.time() + LOG_FLUSH_INTERVAL
+        while len(batch) < LOG_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                row = await asyncio.wait_for(log_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if row is None:
+                stopping = True
+                break
+            batch.append(row)
+        try:
+            await asyncio.to_thread(_write_log_batch, batch)
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} usage log(s): {e}")
+
+def start_log_writer():
+    """Start batching log_request writes on the running event loop."""
+    global _log_queue, _log_writer_task
+    _log_queue = asyncio.Queue(maxsize=LOG_QUEUE_MAXSIZE)
+    _log_writer_task = asyncio.create_task(_log_writer(_log_queue))
+
+async def stop_log_writer():
+    """Flush rows still queued and stop the batched writer."""
+    global _log_queue, _log_writer_task
+    if _log_writer_task is None:
+        return
+    log_queue, task = _log_queue, _log_writer_task
+    # Later log_request calls write directly; the sentinel ends the writer after the backlog.
+    _log_queue, _log_writer_task = None, None
+    _enqueue_log(log_queue, None)
+    await task
+    # Write last_used_at updates that arrived after the final batch
+    await asyncio.to_thread(_write_log_batch, [])
+
+USAGE_STATS_SQL = """
+    WITH filtered AS (
+        SELECT model_name, day, requests, total_latency, latency_samples
+        FROM usage_daily
+        WHERE user_id = ? AND day > DATE('now', ?)
+    )
+    SELECT 'total' as kind, NULL as label, COALESCE(SUM(requests), 0) as count,
+           SUM(total_latency) * 1.0 / NULLIF(SUM(latency_samples), 0) as avg_response_time
+    FROM filtered
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'model', NULLIF(model_name, ''), SUM(requests) as count, NULL
+        FROM filtered
         GROUP BY model_name
         ORDER BY count DESC
         LIMIT 10
-    """, (user_id, since_date))
-    by_model = [dict(row) for row in cursor.fetchall()]
-    
-    # Requests by day
-    cursor.execute("""
-        SELECT DATE(request_time) as date, COUNT(*) as count
-        FROM usage_logs ul
-        JOIN api_tokens at ON ul.token_id = at.id
-        WHERE at.user_id = ? AND ul.request_time > ?
-        GROUP BY DATE(request_time)
-        ORDER BY date DESC
-    """, (user_id, since_date))
-    by_day = [dict(row) for row in cursor.fetchall()]
-    
-    # Average response time
-    cursor.execute("""
-        SELECT AVG(response_time_ms) as avg_response_time
-        FROM usage_logs ul
-        JOIN api_tokens at ON ul.token_id = at.id
-        WHERE at.user_id = ? AND ul.request_time > ?
-    """, (user_id, since_date))
-    avg_response_time = cursor.fetchone()['avg_response_time'] or 0
-    
-    conn.close()
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'day', day, SUM(requests), NULL
+        FROM filtered
+        GROUP BY day
+    )
+"""
+
+def get_usage_stats(user_id: int, days: int = 30) -> Dict[str, Any]:
+    """Get usage statistics for a user from the usage_daily rollup."""
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute(USAGE_STATS_SQL, (user_id, f"-{days} days"))
+        rows = cursor.fetchall()
+    
+    # Rows are tagged by kind: one 'total' row plus 'model' and 'day' groups
+    total_requests = 0
+    avg_response_time = 0
+    by_model = []
+    by_day = []
+    for kind, label, count, avg in rows:
+        if kind == 'total':
+            total_requests = count
+            avg_response_time = avg or 0
+        elif kind == 'model':
+            by_model.append({'model_name': label, 'count': count})
+        else:
+            by_day.append({'date': label, 'count': count})
+    # UNION ALL does not preserve subquery order, so sort each group here
+    by_model.sort(key=lambda m: m['count'], reverse=True)
+    by_day.sort(key=lambda d: d['date'], reverse=True)
     
     return {
         'total_requests': total_requests,
@@ -372,6 +696,3 @@ def get_usage_stats(user_id: int, days: int = 30) -> Dict[str, Any]:
         'by_day': by_day,
         'avg_response_time_ms': round(avg_response_time, 2)
     }
-
-# Initialize database on module import
-init_database()
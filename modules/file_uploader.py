@@ -1,4 +1,6 @@
 # modules/file_uploader.py
+import base64
+import binascii
 import httpx
 import logging
 
@@ -6,7 +8,27 @@ logger = logging.getLogger(__name__)
 
 from typing import Tuple
 
-async def upload_to_file_bed(file_name: str, file_data: str, upload_url: str, api_key: str | None = None) -> Tuple[str | None, str | None]:
+# Shared client so uploads reuse pooled keep-alive connections to the file bed.
+_client: httpx.AsyncClient | None = None
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared upload client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+        )
+    return _client
+
+async def close_client():
+    """Close the shared upload client (call on application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def upload_to_file_bed(file_name: str, file_data: str, upload_url: str, api_key: str | None = None, multipart: bool = False) -> Tuple[str | None, str | None]:
     """
     Upload a base64 encoded file to the file hosting server.
 
@@ -14,29 +36,49 @@ async def upload_to_file_bed(file_name: str, file_data: str, upload_url: str, ap
     :param file_data: Base64 data URI (e.g., "data:image/png;base64,...").
     :param upload_url: The file hosting server's /upload endpoint URL.
     :param api_key: (Optional) API Key for authentication.
+    :param multipart: Send the decoded bytes as multipart/form-data instead of the
+                      base64 JSON body. The server must accept a "file" form field.
     :return: A tuple (filename, error_message). On success, filename is a string and error_message is None;
              On failure, filename is None and error_message contains the error details.
     """
-    payload = {
-        "file_name": file_name,
-        "file_data": file_data,
-        "api_key": api_key
-    }
-    
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(upload_url, json=payload)
-            
-            response.raise_for_status()  # Raises exception if status code is 4xx or 5xx
-            
-            result = response.json()
-            if result.get("success") and result.get("filename"):
-                logger.info(f"File '{file_name}' successfully uploaded to file hosting server, saved as: {result['filename']}")
-                return result["filename"], None
-            else:
-                error_msg = result.get("error", "File hosting server returned an unknown error.")
+        client = _get_client()
+        if multipart:
+            header, sep, encoded = file_data.partition(',')
+            if not header.startswith("data:") or not sep:
+                error_msg = "File data is not a base64 data URI."
                 logger.error(f"Upload to file hosting server failed: {error_msg}")
                 return None, error_msg
+            mime_type = header[5:].split(';', 1)[0] or "application/octet-stream"
+            try:
+                raw = base64.b64decode(encoded, validate=True)
+            except binascii.Error as e:
+                error_msg = f"Invalid base64 file data: {e}"
+                logger.error(f"Upload to file hosting server failed: {error_msg}")
+                return None, error_msg
+            response = await client.post(
+                upload_url,
+                files={"file": (file_name, raw, mime_type)},
+                data={"api_key": api_key} if api_key else None
+            )
+        else:
+            payload = {
+                "file_name": file_name,
+                "file_data": file_data,
+                "api_key": api_key
+            }
+            response = await client.post(upload_url, json=payload)
+        
+        response.raise_for_status()  # Raises exception if status code is 4xx or 5xx
+        
+        result = response.json()
+        if result.get("success") and result.get("filename"):
+            logger.info(f"File '{file_name}' successfully uploaded to file hosting server, saved as: {result['filename']}")
+            return result["filename"], None
+        else:
+            error_msg = result.get("error", "File hosting server returned an unknown error.")
+            logger.error(f"Upload to file hosting server failed: {error_msg}")
+            return None, error_msg
                 
     except httpx.HTTPStatusError as e:
         error_details = f"HTTP error: {e.response.status_code} - {e.response.text}"
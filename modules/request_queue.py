@@ -6,16 +6,17 @@ for cloud deployment architecture.
 """
 
 import asyncio
+import heapq
 import logging
 import time
-from typing import Optional, Dict
-from dataclasses import dataclass
+from typing import Optional, Dict, List, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class QueuedRequest:
     """Represents a queued API request waiting for worker assignment."""
     request_id: str
@@ -25,12 +26,23 @@ class QueuedRequest:
     timeout_seconds: int
     response_queue: asyncio.Queue
     assigned_worker_id: Optional[str] = None
+    _deadline: float = field(init=False, repr=False)
+    _static: dict = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        self._deadline = self.created_at + self.timeout_seconds
+        # Fields that never change, formatted once for to_dict
+        self._static = {
+            "request_id": self.request_id,
+            "model_name": self.model_name,
+            "created_at": datetime.fromtimestamp(self.created_at).isoformat(),
+            "timeout_seconds": self.timeout_seconds,
+        }
     
     @property
     def is_expired(self) -> bool:
         """Check if request has exceeded its timeout."""
-        elapsed = time.time() - self.created_at
-        return elapsed > self.timeout_seconds
+        return time.time() > self._deadline
     
     @property
     def wait_time(self) -> float:
@@ -39,14 +51,12 @@ class QueuedRequest:
     
     def to_dict(self) -> dict:
         """Convert to dictionary for logging/debugging."""
+        now = time.time()
         return {
-            "request_id": self.request_id,
-            "model_name": self.model_name,
-            "created_at": datetime.fromtimestamp(self.created_at).isoformat(),
-            "wait_time": round(self.wait_time, 2),
-            "timeout_seconds": self.timeout_seconds,
+            **self._static,
+            "wait_time": round(now - self.created_at, 2),
             "assigned_worker_id": self.assigned_worker_id,
-            "is_expired": self.is_expired
+            "is_expired": now > self._deadline
         }
 
 
@@ -60,8 +70,11 @@ class RequestQueue:
     
     def __init__(self, config: dict):
         self.config = config
+        # Only touched from the event loop thread; methods never await between
+        # reading and mutating it, so no lock is needed.
         self._requests: Dict[str, QueuedRequest] = {}
-        self._lock = asyncio.Lock()
+        # (deadline, request_id) min-heap; entries for removed requests are skipped lazily
+        self._expiry_heap: List[Tuple[float, str]] = []
         
         # Configuration
         queue_settings = config.get("queue_settings", {})
@@ -72,6 +85,8 @@ class RequestQueue:
         self._total_requests = 0
         self._total_timeouts = 0
         self._total_completed = 0
+        # Running sum of active requests' created_at, for O(1) average wait
+        self._sum_created_at = 0.0
         
         logger.info(
             f"RequestQueue initialized. "
@@ -103,28 +118,32 @@ class RequestQueue:
         Returns:
             QueuedRequest: The created request object
         """
-        async with self._lock:
-            if timeout_seconds is None:
-                timeout_seconds = self._max_wait_seconds
-            
-            queued_request = QueuedRequest(
-                request_id=request_id,
-                payload=payload,
-                model_name=model_name,
-                created_at=time.time(),
-                timeout_seconds=timeout_seconds,
-                response_queue=response_queue
-            )
-            
-            self._requests[request_id] = queued_request
-            self._total_requests += 1
-            
-            logger.info(
-                f"REQUEST TRACK: Request '{request_id[:8]}' added to tracking. "
-                f"Total active: {len(self._requests)}"
-            )
-            
-            return queued_request
+        if timeout_seconds is None:
+            timeout_seconds = self._max_wait_seconds
+        
+        queued_request = QueuedRequest(
+            request_id=request_id,
+            payload=payload,
+            model_name=model_name,
+            created_at=time.time(),
+            timeout_seconds=timeout_seconds,
+            response_queue=response_queue
+        )
+        
+        replaced = self._requests.get(request_id)
+        if replaced is not None:
+            self._sum_created_at -= replaced.created_at
+        self._requests[request_id] = queued_request
+        self._sum_created_at += queued_request.created_at
+        heapq.heappush(self._expiry_heap, (queued_request._deadline, request_id))
+        self._total_requests += 1
+        
+        logger.info(
+            f"REQUEST TRACK: Request '{request_id[:8]}' added to tracking. "
+            f"Total active: {len(self._requests)}"
+        )
+        
+        return queued_request
     
     async def assign_to_worker(self, request_id: str, worker_id: str) -> bool:
         """
@@ -137,21 +156,19 @@ class RequestQueue:
         Returns:
             bool: True if successful, False if request not found
         """
-        async with self._lock:
-            if request_id not in self._requests:
-                logger.error(f"REQUEST ASSIGN: Request '{request_id[:8]}' not found")
-                return False
-            
-            self._requests[request_id].assigned_worker_id = worker_id
-            logger.info(
-                f"REQUEST ASSIGN: Request '{request_id[:8]}' assigned to worker '{worker_id}'"
-            )
-            return True
+        if request_id not in self._requests:
+            logger.error(f"REQUEST ASSIGN: Request '{request_id[:8]}' not found")
+            return False
+        
+        self._requests[request_id].assigned_worker_id = worker_id
+        logger.info(
+            f"REQUEST ASSIGN: Request '{request_id[:8]}' assigned to worker '{worker_id}'"
+        )
+        return True
     
     async def get_request(self, request_id: str) -> Optional[QueuedRequest]:
         """Get a specific request by ID."""
-        async with self._lock:
-            return self._requests.get(request_id)
+        return self._requests.get(request_id)
     
     async def remove_request(self, request_id: str, completed: bool = True, timeout: bool = False) -> bool:
         """
@@ -165,31 +182,39 @@ class RequestQueue:
         Returns:
             bool: True if removed, False if not found
         """
-        async with self._lock:
-            if request_id not in self._requests:
-                logger.warning(f"REQUEST REMOVE: Request '{request_id[:8]}' not found")
-                return False
-            
-            request = self._requests[request_id]
-            del self._requests[request_id]
-            
-            # Update statistics
-            if timeout:
-                self._total_timeouts += 1
-                logger.warning(
-                    f"REQUEST TIMEOUT: Request '{request_id[:8]}' timed out after "
-                    f"{request.wait_time:.2f}s"
-                )
-            elif completed:
-                self._total_completed += 1
-                logger.info(
-                    f"REQUEST COMPLETE: Request '{request_id[:8]}' completed in "
-                    f"{request.wait_time:.2f}s by worker '{request.assigned_worker_id}'"
-                )
-            else:
-                logger.info(f"REQUEST REMOVE: Request '{request_id[:8]}' removed")
-            
-            return True
+        request = self._requests.pop(request_id, None)
+        if request is None:
+            logger.warning(f"REQUEST REMOVE: Request '{request_id[:8]}' not found")
+            return False
+        # Reset when empty so floating point drift can't accumulate
+        self._sum_created_at = self._sum_created_at - request.created_at if self._requests else 0.0
+        
+        # Update statistics
+        if timeout:
+            self._total_timeouts += 1
+            logger.warning(
+                f"REQUEST TIMEOUT: Request '{request_id[:8]}' timed out after "
+                f"{request.wait_time:.2f}s"
+            )
+        elif completed:
+            self._total_completed += 1
+            logger.info(
+                f"REQUEST COMPLETE: Request '{request_id[:8]}' completed in "
+                f"{request.wait_time:.2f}s by worker '{request.assigned_worker_id}'"
+            )
+        else:
+            logger.info(f"REQUEST REMOVE: Request '{request_id[:8]}' removed")
+        
+        return True
+    
+    @staticmethod
+    async def _send_error(request: QueuedRequest, message: str, failure_log: str):
+        """Put an error followed by [DONE] on a request's response queue."""
+        try:
+            await request.response_queue.put({"error": message})
+            await request.response_queue.put("[DONE]")
+        except Exception as e:
+            logger.error(f"{failure_log}: {e}")
     
     async def cleanup_expired_requests(self) -> int:
         """
@@ -198,73 +223,73 @@ class RequestQueue:
         Returns:
             int: Number of requests cleaned up
         """
-        async with self._lock:
-            expired_ids = [
-                req_id for req_id, req in self._requests.items()
-                if req.is_expired
-            ]
-            
-            for req_id in expired_ids:
-                request = self._requests[req_id]
-                
-                # Send timeout error to response queue
-                try:
-                    await request.response_queue.put({
-                        "error": f"Request timed out after {request.timeout_seconds} seconds"
-                    })
-                    await request.response_queue.put("[DONE]")
-                except Exception as e:
-                    logger.error(f"Error sending timeout to response queue: {e}")
-                
-                # Remove from tracking
-                await self.remove_request(req_id, completed=False, timeout=True)
-            
-            if expired_ids:
-                logger.info(f"CLEANUP: Removed {len(expired_ids)} expired request(s)")
-            
-            return len(expired_ids)
+        # Pop only deadlines that have passed instead of scanning every request
+        now = time.time()
+        expired = []
+        while self._expiry_heap and self._expiry_heap[0][0] < now:
+            deadline, req_id = heapq.heappop(self._expiry_heap)
+            request = self._requests.get(req_id)
+            # Skip ids that already finished or were reused by a newer request
+            if request is not None and request._deadline == deadline:
+                expired.append(request)
+        
+        # Remove from tracking before notifying so nothing else picks them up
+        for request in expired:
+            await self.remove_request(request.request_id, completed=False, timeout=True)
+        
+        # Send timeout errors to all response queues concurrently
+        await asyncio.gather(*(
+            self._send_error(
+                request,
+                f"Request timed out after {request.timeout_seconds} seconds",
+                "Error sending timeout to response queue"
+            )
+            for request in expired
+        ))
+        
+        if expired:
+            logger.info(f"CLEANUP: Removed {len(expired)} expired request(s)")
+        
+        return len(expired)
     
     async def get_active_requests(self) -> list[dict]:
         """Get list of all active requests."""
-        async with self._lock:
-            return [req.to_dict() for req in self._requests.values()]
+        return [req.to_dict() for req in self._requests.values()]
     
     async def get_stats(self) -> dict:
         """Get queue statistics."""
-        async with self._lock:
-            active_requests = len(self._requests)
-            
-            # Calculate average wait time for active requests
-            avg_wait = 0.0
-            if active_requests > 0:
-                total_wait = sum(req.wait_time for req in self._requests.values())
-                avg_wait = total_wait / active_requests
-            
-            return {
-                "active_requests": active_requests,
-                "total_requests": self._total_requests,
-                "total_completed": self._total_completed,
-                "total_timeouts": self._total_timeouts,
-                "avg_wait_time": round(avg_wait, 2),
-                "max_wait_seconds": self._max_wait_seconds,
-                "reject_when_no_workers": self._reject_when_no_workers
-            }
+        active_requests = len(self._requests)
+        
+        # Average wait = now - mean(created_at)
+        avg_wait = 0.0
+        if active_requests > 0:
+            avg_wait = time.time() - self._sum_created_at / active_requests
+        
+        return {
+            "active_requests": active_requests,
+            "total_requests": self._total_requests,
+            "total_completed": self._total_completed,
+            "total_timeouts": self._total_timeouts,
+            "avg_wait_time": round(avg_wait, 2),
+            "max_wait_seconds": self._max_wait_seconds,
+            "reject_when_no_workers": self._reject_when_no_workers
+        }
     
     async def clear_all(self):
         """Clear all requests (used for shutdown)."""
-        async with self._lock:
-            # Send error to all pending requests
-            for request in self._requests.values():
-                try:
-                    await request.response_queue.put({
-                        "error": "Server is shutting down"
-                    })
-                    await request.response_queue.put("[DONE]")
-                except Exception as e:
-                    logger.error(f"Error sending shutdown error: {e}")
-            
-            count = len(self._requests)
-            self._requests.clear()
-            
-            if count > 0:
-                logger.info(f"CLEAR: Cleared {count} pending request(s)")
+        # Detach everything first so new removals can't mutate the dict mid-loop
+        requests = list(self._requests.values())
+        self._requests.clear()
+        self._expiry_heap.clear()
+        self._sum_created_at = 0.0
+        
+        # Send error to all pending requests concurrently
+        await asyncio.gather(*(
+            self._send_error(request, "Server is shutting down", "Error sending shutdown error")
+            for request in requests
+        ))
+        
+        count = len(requests)
+        
+        if count > 0:
+            logger.info(f"CLEAR: Cleared {count} pending request(s)")
@@ -1,68 +1,127 @@
 # update_script.py
+import filecmp
+import mmap
 import os
 import shutil
 import time
 import subprocess
 import sys
 import json
+import glob
+import threading
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def _parse_jsonc(jsonc_string: str) -> dict:
-    """
-    Robustly parse JSONC string, removing comments.
-    """
-    lines = jsonc_string.splitlines()
-    no_comments_lines = []
-    in_block_comment = False
-    for line in lines:
-        stripped_line = line.strip()
-        if in_block_comment:
-            if '*/' in stripped_line:
-                in_block_comment = False
-                line = stripped_line.split('*/', 1)[1]
-            else:
-                continue
-        
-        if '/*' in line and not in_block_comment:
-            before_comment, _, after_comment = line.partition('/*')
-            if '*/' in after_comment:
-                _, _, after_block = after_comment.partition('*/')
-                line = before_comment + after_block
-            else:
-                line = before_comment
-                in_block_comment = True
+# One left-to-right scan over the raw bytes: string literals are matched first
+# so "//" or "/*" inside them (e.g. URLs) is never mistaken for a comment.
+_JSONC_TOKEN_RE = re.compile(rb'"(?:[^"\\]|\\.)*"|//[^\n]*|/\*.*?(?:\*/|$)', re.DOTALL)
+_BLANK_BYTES = bytes(10 if i == 10 else 32 for i in range(256))
 
-        if line.strip().startswith('//'):
-            continue
-        
-        no_comments_lines.append(line)
+# "key": <scalar> pairs in a config template, for merging old values in one pass
+_CONFIG_VALUE_RE = re.compile(
+    r'"(?P<key>[^"\\]+)"(?P<sep>\s*:\s*)(?:"(?:[^"\\]|\\.)*"|true|false|-?[\d.]+)'
+)
 
-    return json.loads("\n".join(no_comments_lines))
+def _blank_comment(match):
+    token = match.group(0)
+    return token if token.startswith(b'"') else token.translate(_BLANK_BYTES)
 
 def load_jsonc_values(path):
     """Load data from a .jsonc file, ignoring comments, returning only key-value pairs."""
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return _parse_jsonc(content)
+        # Scan the page-cache-backed mapping directly; only the stripped copy is allocated
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm.find(b'/') == -1:
+                return json.loads(mm[:])
+            return json.loads(_JSONC_TOKEN_RE.sub(_blank_comment, mm))
     except (FileNotFoundError, json.JSONDecodeError, Exception) as e:
         print(f"Error loading or parsing values from {path}: {e}")
         return None
 
-def get_all_relative_paths(directory):
-    """Get relative paths of all files and empty folders in a directory."""
-    paths = set()
-    for root, dirs, files in os.walk(directory):
-        # Add files
-        for name in files:
-            path = os.path.join(root, name)
-            paths.add(os.path.relpath(path, directory))
-        # Add empty folders
-        for name in dirs:
-            dir_path = os.path.join(root, name)
-            if not os.listdir(dir_path):
-                paths.add(os.path.relpath(dir_path, directory) + os.sep)
-    return paths
+def _walk(directory):
+    """
+    Yield (path, rel_path, kind) for everything under directory using os.scandir.
+    
+    kind is "file" or "dir"; an empty directory is yielded a second time
+    with kind "empty_dir". rel_path is built by concatenating names onto the
+    parent's prefix, so no os.path.relpath call is needed per entry.
+    """
+    stack = [(directory, "")]
+    while stack:
+        current, prefix = stack.pop()
+        empty = True
+        with os.scandir(current) as it:
+            for entry in it:
+                empty = False
+                rel = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, rel + os.sep))
+                    yield entry.path, rel, "dir"
+                else:
+                    yield entry.path, rel, "file"
+        if empty and prefix:
+            yield current, prefix[:-1], "empty_dir"
+
+def _atomic_write(path, content):
+    """Write text to a sibling temp file and os.replace it over path."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _fast_copy(src, dst):
+    """
+    Hardlink src to dst, falling back to shutil.copy2.
+    
+    update_temp is deleted after the update, so linking is safe and avoids
+    copying file contents when both trees are on the same filesystem.
+    Files whose contents are unchanged are left untouched.
+    """
+    if os.path.isfile(dst) and filecmp.cmp(src, dst, shallow=False):
+        return dst
+    # Link under a sibling temp name and os.replace it over dst, so a failed
+    # link never leaves dst missing (same pattern as _atomic_write)
+    tmp_path = dst + ".tmp"
+    try:
+        if os.path.lexists(tmp_path):
+            os.unlink(tmp_path)
+        os.link(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except OSError:
+        if os.path.lexists(tmp_path):
+            os.unlink(tmp_path)
+        shutil.copy2(src, dst)
+    return dst
+
+def _copy_files_parallel(pairs):
+    """Copy (src, dst) file pairs on a thread pool; file I/O releases the GIL."""
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_fast_copy, src, dst) for src, dst in pairs]
+        for future in as_completed(futures):
+            future.result()  # Re-raise the first copy error
+
+def _discard_dir(path):
+    """
+    Rename a directory aside and delete it on a background thread.
+    
+    The rename is a single metadata operation, so the update can continue
+    immediately. The thread is not a daemon, so the interpreter waits for the
+    delete to finish after main() has launched the restart; anything left by
+    a crash is swept on the next run.
+    """
+    garbage = f"{path}.trash-{os.getpid()}"
+    os.rename(path, garbage)
+    threading.Thread(
+        target=shutil.rmtree, args=(garbage,), kwargs={"ignore_errors": True}
+    ).start()
+
+def _sweep_trash(path):
+    """Remove leftover trash directories from earlier runs of _discard_dir."""
+    for garbage in glob.glob(glob.escape(path) + ".trash-*"):
+        shutil.rmtree(garbage, ignore_errors=True)
 
 def main():
     print("--- Update Script Started ---")
@@ -79,6 +138,8 @@ def main():
     models_filename = 'models.json'
     model_endpoint_map_filename = 'model_endpoint_map.json'
     
+    _sweep_trash(update_dir)
+    
     if not os.path.exists(source_dir_inner):
         print(f"Error: Source directory {source_dir_inner} not found. Update failed.")
         return
@@ -92,17 +153,9 @@ def main():
     old_models_path = os.path.join(destination_dir, models_filename)
     old_config_values = load_jsonc_values(old_config_path)
     
-    # 4. Determine files and folders to preserve
-    # Preserve update_temp itself, .git directory, and any hidden files/folders user may have added
-    preserved_items = {update_dir, ".git", ".github"}
-
-    # 5. Get new and old file lists
-    new_files = get_all_relative_paths(source_dir_inner)
-    # Exclude .git and .github directories as they shouldn't be deployed
-    new_files = {f for f in new_files if not (f.startswith('.git') or f.startswith('.github'))}
-
-    current_files = get_all_relative_paths(destination_dir)
-
+    # 4-6. File change analysis
+    # Deletion is disabled, so the old and new trees are not walked to diff them;
+    # step 7 only copies what the release contains.
     print("\n--- File Change Analysis ---")
     print("[*] File deletion feature disabled to protect user data. Only performing file copy and configuration update.")
 
@@ -111,6 +164,8 @@ def main():
     try:
         new_config_template_path = os.path.join(source_dir_inner, config_filename)
         
+        # Create directories up front, then copy files concurrently
+        copy_pairs = []
         for item in os.listdir(source_dir_inner):
             s = os.path.join(source_dir_inner, item)
             d = os.path.join(destination_dir, item)
@@ -129,9 +184,17 @@ def main():
                 continue # Skip models.json file, preserve user's local version
 
             if os.path.isdir(s):
-                shutil.copytree(s, d, dirs_exist_ok=True)
+                os.makedirs(d, exist_ok=True)
+                for path, rel, kind in _walk(s):
+                    target = os.path.join(d, rel)
+                    if kind == "dir":
+                        os.makedirs(target, exist_ok=True)
+                    elif kind == "file":
+                        copy_pairs.append((path, target))
             else:
-                shutil.copy2(s, d)
+                copy_pairs.append((s, d))
+
+        _copy_files_parallel(copy_pairs)
         print("File copy successful.")
 
     except Exception as e:
@@ -149,20 +212,23 @@ def main():
             new_version = new_version_values.get("version", "unknown")
             old_config_values["version"] = new_version
 
-            for key, value in old_config_values.items():
-                if isinstance(value, str):
-                    replacement_value = f'"{value}"'
-                elif isinstance(value, bool):
-                    replacement_value = str(value).lower()
-                else:
-                    replacement_value = str(value)
-                
-                pattern = re.compile(f'("{key}"\s*:\s*)(?:".*?"|true|false|[\d\.]+)')
-                if pattern.search(new_config_content):
-                    new_config_content = pattern.sub(f'\\g<1>{replacement_value}', new_config_content)
-
-            with open(old_config_path, 'w', encoding='utf-8') as f:
-                f.write(new_config_content)
+            # Serialize scalar values once, then substitute them in a single pass
+            replacements = {
+                key: json.dumps(value, ensure_ascii=False)
+                for key, value in old_config_values.items()
+                if isinstance(value, (str, bool, int, float))
+            }
+
+            def replace_value(match):
+                key = match.group('key')
+                if key not in replacements:
+                    return match.group(0)
+                return f'"{key}"{match.group("sep")}{replacements[key]}'
+
+            new_config_content = _CONFIG_VALUE_RE.sub(replace_value, new_config_content)
+
+            # A crash mid-write leaves the old config intact instead of a truncated file
+            _atomic_write(old_config_path, new_config_content)
             print("Configuration merge successful.")
 
         except Exception as e:
@@ -175,7 +241,7 @@ def main():
     # 9. Clean up temporary folder
     print("\n[*] Cleaning up temporary files...")
     try:
-        shutil.rmtree(update_dir)
+        _discard_dir(update_dir)
         print("Cleanup complete.")
     except Exception as e:
         print(f"Error occurred while cleaning up temporary files: {e}")
@@ -5,43 +5,50 @@ This module handles worker registration, authentication, status tracking,
 and load balancing for distributed worker architecture.
 """
 
+import hashlib
+import heapq
+import itertools
 import logging
 import time
 import threading
 import os
 from datetime import datetime
-from typing import Optional, Dict, List
-from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Optional, Dict, List, Mapping, Tuple
+from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class Worker:
     """Represents a connected worker instance."""
     worker_id: str
     auth_token: str
     websocket: object  # WebSocket connection
     status: str = "idle"  # idle, busy, offline
-    connected_at: float = field(default_factory=time.time)
-    last_heartbeat: float = field(default_factory=time.time)
+    # Timestamps are supplied by WorkerManager.register_worker
+    connected_at: float = 0.0
+    last_heartbeat: float = 0.0
+    # Monotonic copy of last_heartbeat for health checks (immune to clock jumps)
+    last_heartbeat_mono: float = 0.0
+    heartbeat_timeout: float = 120  # seconds
     current_request_id: Optional[str] = None
     requests_processed: int = 0
     total_processing_time: float = 0.0
+    # Kept in sync with the two totals above by WorkerManager.mark_worker_idle
+    avg_response_time: float = 0.0
     last_error: Optional[str] = None
     
-    @property
-    def avg_response_time(self) -> float:
-        """Calculate average response time for this worker."""
-        if self.requests_processed == 0:
-            return 0.0
-        return self.total_processing_time / self.requests_processed
-    
-    @property
-    def is_healthy(self) -> bool:
-        """Check if worker is responding to heartbeats."""
-        time_since_heartbeat = time.time() - self.last_heartbeat
-        return time_since_heartbeat < 120  # 2 minutes timeout
+    def is_healthy(self, now: Optional[float] = None) -> bool:
+        """
+        Check if worker is responding to heartbeats.
+        
+        Pass now=time.monotonic() when checking many workers at once.
+        """
+        if now is None:
+            now = time.monotonic()
+        return now - self.last_heartbeat_mono < self.heartbeat_timeout
     
     def to_dict(self) -> dict:
         """Convert worker to dictionary for JSON serialization."""
@@ -53,7 +60,7 @@ class Worker:
             "current_request_id": self.current_request_id,
             "requests_processed": self.requests_processed,
             "avg_response_time": round(self.avg_response_time, 2),
-            "is_healthy": self.is_healthy,
+            "is_healthy": self.is_healthy(),
             "last_error": self.last_error
         }
 
@@ -66,9 +73,17 @@ class WorkerManager:
     
     def __init__(self, config: dict):
         self.config = config
-        self.workers: Dict[str, Worker] = {}
+        # Copy-on-write: writers swap in a new read-only mapping under _lock,
+        # so readers can use whatever snapshot they see without locking.
+        self.workers: Mapping[str, Worker] = MappingProxyType({})
         self._lock = threading.RLock()
-        self._valid_tokens = self._load_valid_tokens()
+        # Idle workers keyed by (avg_response_time, requests_processed, worker_id, seq).
+        # Entries are invalidated lazily: only the seq in _idle_seq is current.
+        self._idle_heap: List[Tuple[float, int, str, int]] = []
+        self._idle_seq: Dict[str, int] = {}
+        self._seq = itertools.count()
+        # Only digests of the valid tokens are kept in memory
+        self._token_hashes = frozenset(self._hash_token(t) for t in self._load_valid_tokens())
         self._max_workers = config.get("worker_settings", {}).get("max_workers", 10)
         self._heartbeat_timeout = config.get("worker_settings", {}).get("worker_timeout_seconds", 120)
         
@@ -99,18 +114,37 @@ class WorkerManager:
         
         return set(tokens)
     
+    @staticmethod
+    def _hash_token(token: str) -> bytes:
+        """Fixed-size digest of a worker token, used for membership checks."""
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+    
     def authenticate_worker(self, auth_token: str) -> bool:
         """Validate worker authentication token."""
         if not self.config.get("worker_settings", {}).get("require_authentication", True):
             logger.info("Worker authentication is disabled.")
             return True
         
-        is_valid = auth_token in self._valid_tokens
+        # Comparing digests means timing never depends on how much of a real token matched
+        is_valid = self._hash_token(auth_token) in self._token_hashes
         if not is_valid:
             logger.warning(f"Authentication failed for token: {auth_token[:10]}...")
         
         return is_valid
     
+    def _push_idle(self, worker: Worker):
+        """Add an idle worker to the selection heap. Caller must hold _lock."""
+        seq = next(self._seq)
+        self._idle_seq[worker.worker_id] = seq
+        heapq.heappush(
+            self._idle_heap,
+            (worker.avg_response_time, worker.requests_processed, worker.worker_id, seq)
+        )
+        # Drop accumulated stale entries once they dominate the heap
+        if len(self._idle_heap) > 4 * len(self._idle_seq) + 16:
+            self._idle_heap = [e for e in self._idle_heap if self._idle_seq.get(e[2]) == e[3]]
+            heapq.heapify(self._idle_heap)
+    
     def register_worker(self, worker_id: str, auth_token: str, websocket) -> tuple[bool, str]:
         """
         Register a new worker.
@@ -138,12 +172,20 @@ class WorkerManager:
                 return False, msg
             
             # Create and register worker
+            now = time.time()
             worker = Worker(
                 worker_id=worker_id,
                 auth_token=auth_token,
-                websocket=websocket
+                websocket=websocket,
+                connected_at=now,
+                last_heartbeat=now,
+                last_heartbeat_mono=time.monotonic(),
+                heartbeat_timeout=self._heartbeat_timeout
             )
-            self.workers[worker_id] = worker
+            workers = dict(self.workers)
+            workers[worker_id] = worker
+            self.workers = MappingProxyType(workers)
+            self._push_idle(worker)
             
             logger.info(f"✅ WORKER REGISTER: Worker '{worker_id}' registered successfully. Total workers: {len(self.workers)}")
             return True, "Worker registered successfully"
@@ -164,7 +206,10 @@ class WorkerManager:
                         f"WORKER UNREGISTER: Worker '{worker_id}' disconnected while processing request '{worker.current_request_id[:8]}'"
                     )
                 
-                del self.workers[worker_id]
+                workers = dict(self.workers)
+                del workers[worker_id]
+                self.workers = MappingProxyType(workers)
+                self._idle_seq.pop(worker_id, None)
                 logger.info(f"❌ WORKER UNREGISTER: Worker '{worker_id}' removed. Remaining workers: {len(self.workers)}")
                 return True
             
@@ -179,24 +224,36 @@ class WorkerManager:
         Returns:
             Optional[Worker]: Available worker or None if no workers available
         """
+        # Select worker with least average response time (least loaded) from the heap
+        selected_worker = None
+        now = time.monotonic()
         with self._lock:
-            available_workers = [
-                w for w in self.workers.values()
-                if w.status == "idle" and w.is_healthy
-            ]
-            
-            if not available_workers:
-                logger.warning("GET WORKER: No available workers found")
-                return None
-            
-            # Select worker with least average response time (least loaded)
-            selected_worker = min(available_workers, key=lambda w: w.avg_response_time)
-            logger.info(
-                f"GET WORKER: Selected worker '{selected_worker.worker_id}' "
-                f"(processed: {selected_worker.requests_processed}, "
-                f"avg time: {selected_worker.avg_response_time:.2f}s)"
-            )
-            return selected_worker
+            unhealthy_entries = []
+            while self._idle_heap:
+                entry = self._idle_heap[0]
+                worker = self.workers.get(entry[2])
+                if worker is None or worker.status != "idle" or self._idle_seq.get(entry[2]) != entry[3]:
+                    heapq.heappop(self._idle_heap)  # Stale entry
+                    continue
+                if not worker.is_healthy(now):
+                    # Set aside; it becomes selectable again if heartbeats resume
+                    unhealthy_entries.append(heapq.heappop(self._idle_heap))
+                    continue
+                selected_worker = worker
+                break
+            for entry in unhealthy_entries:
+                heapq.heappush(self._idle_heap, entry)
+        
+        if selected_worker is None:
+            logger.warning("GET WORKER: No available workers found")
+            return None
+        
+        logger.info(
+            f"GET WORKER: Selected worker '{selected_worker.worker_id}' "
+            f"(processed: {selected_worker.requests_processed}, "
+            f"avg time: {selected_worker.avg_response_time:.2f}s)"
+        )
+        return selected_worker
     
     def mark_worker_busy(self, worker_id: str, request_id: str) -> bool:
         """
@@ -213,6 +270,7 @@ class WorkerManager:
             worker = self.workers[worker_id]
             worker.status = "busy"
             worker.current_request_id = request_id
+            self._idle_seq.pop(worker_id, None)
             logger.info(f"MARK BUSY: Worker '{worker_id}' now processing request '{request_id[:8]}'")
             return True
     
@@ -237,8 +295,10 @@ class WorkerManager:
             worker.status = "idle"
             worker.requests_processed += 1
             worker.total_processing_time += processing_time
+            worker.avg_response_time = worker.total_processing_time / worker.requests_processed
             worker.current_request_id = None
             worker.last_error = error
+            self._push_idle(worker)
             
             status_msg = "completed" if not error else f"failed: {error}"
             logger.info(
@@ -258,33 +318,53 @@ class WorkerManager:
             if worker_id not in self.workers:
                 return False
             
-            self.workers[worker_id].last_heartbeat = time.time()
+            worker = self.workers[worker_id]
+            worker.last_heartbeat = time.time()
+            worker.last_heartbeat_mono = time.monotonic()
             return True
     
     def get_worker(self, worker_id: str) -> Optional[Worker]:
         """Get a specific worker by ID."""
-        with self._lock:
-            return self.workers.get(worker_id)
+        return self.workers.get(worker_id)
     
     def get_all_workers(self) -> List[Worker]:
         """Get list of all registered workers."""
-        with self._lock:
-            return list(self.workers.values())
+        return list(self.workers.values())
+    
+    @staticmethod
+    def _tally(workers) -> tuple[int, int, int, int, float]:
+        """
+        Count workers in one pass.
+        
+        Returns:
+            tuple: (idle, busy, unhealthy, requests_processed, processing_time)
+        """
+        now = time.monotonic()
+        idle = busy = unhealthy = total_requests = 0
+        total_time = 0.0
+        for w in workers:
+            total_requests += w.requests_processed
+            total_time += w.total_processing_time
+            healthy = w.is_healthy(now)
+            if w.status == "idle" and healthy:
+                idle += 1
+            elif w.status == "busy":
+                busy += 1
+            if not healthy:
+                unhealthy += 1
+        return idle, busy, unhealthy, total_requests, total_time
     
     def get_worker_count(self) -> Dict[str, int]:
         """Get count of workers by status."""
-        with self._lock:
-            total = len(self.workers)
-            idle = sum(1 for w in self.workers.values() if w.status == "idle" and w.is_healthy)
-            busy = sum(1 for w in self.workers.values() if w.status == "busy")
-            unhealthy = sum(1 for w in self.workers.values() if not w.is_healthy)
-            
-            return {
-                "total": total,
-                "idle": idle,
-                "busy": busy,
-                "unhealthy": unhealthy
-            }
+        workers = list(self.workers.values())
+        idle, busy, unhealthy, _, _ = self._tally(workers)
+        
+        return {
+            "total": len(workers),
+            "idle": idle,
+            "busy": busy,
+            "unhealthy": unhealthy
+        }
     
     def cleanup_unhealthy_workers(self) -> int:
         """
@@ -293,10 +373,11 @@ class WorkerManager:
         Returns:
             int: Number of workers removed
         """
+        now = time.monotonic()
         with self._lock:
             unhealthy_workers = [
                 worker_id for worker_id, worker in self.workers.items()
-                if not worker.is_healthy
+                if not worker.is_healthy(now)
             ]
             
             for worker_id in unhealthy_workers:
@@ -310,31 +391,27 @@ class WorkerManager:
     
     def get_stats(self) -> dict:
         """Get overall worker pool statistics."""
-        with self._lock:
-            workers_list = list(self.workers.values())
-            
-            if not workers_list:
-                return {
-                    "total_workers": 0,
-                    "idle_workers": 0,
-                    "busy_workers": 0,
-                    "unhealthy_workers": 0,
-                    "total_requests_processed": 0,
-                    "avg_response_time": 0.0
-                }
-            
-            total_requests = sum(w.requests_processed for w in workers_list)
-            avg_response_time = (
-                sum(w.avg_response_time * w.requests_processed for w in workers_list) / total_requests
-                if total_requests > 0 else 0.0
-            )
-            
+        workers_list = list(self.workers.values())
+        
+        if not workers_list:
             return {
-                "total_workers": len(workers_list),
-                "idle_workers": sum(1 for w in workers_list if w.status == "idle" and w.is_healthy),
-                "busy_workers": sum(1 for w in workers_list if w.status == "busy"),
-                "unhealthy_workers": sum(1 for w in workers_list if not w.is_healthy),
-                "total_requests_processed": total_requests,
-                "avg_response_time": round(avg_response_time, 2),
-                "max_workers": self._max_workers
+                "total_workers": 0,
+                "idle_workers": 0,
+                "busy_workers": 0,
+                "unhealthy_workers": 0,
+                "total_requests_processed": 0,
+                "avg_response_time": 0.0
             }
+        
+        idle, busy, unhealthy, total_requests, total_time = self._tally(workers_list)
+        avg_response_time = total_time / total_requests if total_requests > 0 else 0.0
+        
+        return {
+            "total_workers": len(workers_list),
+            "idle_workers": idle,
+            "busy_workers": busy,
+            "unhealthy_workers": unhealthy,
+            "total_requests_processed": total_requests,
+            "avg_response_time": round(avg_response_time, 2),
+            "max_workers": self._max_workers
+        }
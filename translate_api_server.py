@@ -75,14 +75,19 @@ translations = {
     '"""接收来自 id_updater.py 的通知"""': '"""Receive notification from id_updater.py"""',
 }
 
+# One alternation over every key, longest first so a longer phrase wins over
+# any shorter phrase it contains; the file is scanned once instead of once per key.
+_TRANSLATION_RE = re.compile(
+    "|".join(re.escape(k) for k in sorted(translations, key=len, reverse=True))
+)
+
 def translate_file(input_path, output_path):
     """Translate Chinese content in the file."""
     with open(input_path, 'r', encoding='utf-8') as f:
         content = f.read()
     
-    # Apply all translations
-    for chinese, english in translations.items():
-        content = content.replace(chinese, english)
+    # Apply all translations in a single pass
+    content = _TRANSLATION_RE.sub(lambda m: translations[m.group(0)], content)
     
     # Additional regex-based translations for common patterns
     # Translate logger messages
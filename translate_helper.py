@@ -4,8 +4,12 @@ Helper script to translate Chinese comments and strings to English in Python fil
 This script processes files and translates common Chinese phrases found in comments and strings.
 """
 
+import atexit
+import functools
+import json
+import os
 import re
-import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # Translation dictionary for common phrases and patterns
 TRANSLATIONS = {
@@ -70,45 +74,133 @@ TRANSLATIONS = {
     "前": "before",
 }
 
+CHUNK_SIZE = 64 * 1024
+SNIFF_SIZE = 4096
+
+SOURCE_EXTS = {'.py', '.js', '.md'}
+SKIP_DIRS = {'.git', '__pycache__', 'node_modules', 'venv', '.venv'}
+
+# {path: [mtime_ns, size, chinese_chars]} from earlier runs
+CACHE_FILE = ".translate_helper_cache.json"
+_scan_cache = {}
+
+# U+4E00..U+9FFF encodes as three UTF-8 bytes led by 0xE4..0xE9. Lead bytes
+# never appear as continuation bytes, so counting them with bytes.count is
+# exact; 0xE4 only qualifies when followed by 0xB8..0xBF.
+_CJK_LEADS = tuple(bytes([b]) for b in range(0xE5, 0xEA))
+_CJK_E4_PAIRS = tuple(bytes([0xE4, b]) for b in range(0xB8, 0xC0))
+
+# One alternation over every key, longest first so "模型更新" wins over "更新";
+# the text is scanned once and replaced output is never re-matched.
+_TRANSLATION_RE = re.compile(
+    "|".join(re.escape(k) for k in sorted(TRANSLATIONS, key=len, reverse=True))
+)
+
+def count_cjk(data):
+    """Count CJK Unified Ideographs in UTF-8 encoded bytes."""
+    return (sum(data.count(b) for b in _CJK_LEADS)
+            + sum(data.count(p) for p in _CJK_E4_PAIRS))
+
+@functools.lru_cache(maxsize=4096)
 def translate_comment(text):
     """Attempt to translate a Chinese comment to English."""
     # This is a simplified translator - in production you'd use a real translation API
-    result = text
-    for cn, en in TRANSLATIONS.items():
-        result = result.replace(cn, en)
-    return result
+    return _TRANSLATION_RE.sub(lambda m: TRANSLATIONS[m.group(0)], text)
+
+def find_source_files(root):
+    """Recursively list scannable source files under root, pruning vendored dirs."""
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1] in SOURCE_EXTS:
+                files.append(os.path.join(dirpath, name))
+    return files
+
+def load_scan_cache():
+    """Load per-file scan results saved by a previous run."""
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            _scan_cache.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+
+def save_scan_cache():
+    """Persist per-file scan results, replacing the cache file atomically."""
+    tmp = CACHE_FILE + '.tmp'
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(_scan_cache, f)
+        os.replace(tmp, CACHE_FILE)
+    except OSError as e:
+        print(f"Could not save scan cache: {e}")
+
+def _count_cjk_stream(raw):
+    """Count CJK characters in a binary stream without decoding it."""
+    buf = bytearray(CHUNK_SIZE)
+    total = 0
+    split_e4 = False
+    while True:
+        n = raw.readinto(buf)
+        if not n:
+            return total
+        chunk = buf if n == CHUNK_SIZE else buf[:n]
+        # An 0xE4 lead byte at the end of the previous chunk pairs with this byte
+        if split_e4 and 0xB8 <= chunk[0] <= 0xBF:
+            total += 1
+        total += count_cjk(chunk)
+        split_e4 = chunk[-1] == 0xE4
 
 def process_file(filepath):
-    """Process a single file and translate Chinese content."""
+    """Scan a single file and return (filepath, chinese_chars, status).
+
+    chinese_chars is None when the file was skipped; status then says why.
+    """
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Count Chinese characters
-        chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', content))
-        print(f"Processing {filepath}: {chinese_chars} Chinese characters found")
+        # Cheap checks first: missing and empty files never get opened
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError:
+            return filepath, None, "file not found"
+        if st.st_size == 0:
+            return filepath, None, "empty file"
+
+        # Unchanged since the last run: reuse the stored count
+        key = (st.st_mtime_ns, st.st_size)
+        cached = _scan_cache.get(filepath)
+        if cached is not None and tuple(cached[:2]) == key:
+            chinese_chars = cached[2]
+        else:
+            with open(filepath, 'rb') as raw:
+                # A NUL byte in the first block means binary content; skip the scan
+                if b'\0' in raw.read(SNIFF_SIZE):
+                    return filepath, None, "binary file"
+                raw.seek(0)
+                chinese_chars = _count_cjk_stream(raw)
+            _scan_cache[filepath] = [*key, chinese_chars]
         
         if chinese_chars == 0:
-            print(f"  ✓ No Chinese characters found, skipping")
-            return
+            return filepath, chinese_chars, "✓ No Chinese characters found, skipping"
             
         # For now, just report - actual translation requires manual review
-        print(f"  ! File needs manual translation")
+        return filepath, chinese_chars, "! File needs manual translation"
         
     except Exception as e:
-        print(f"Error processing {filepath}: {e}")
+        return filepath, None, f"error ({e})"
+
+def format_result(filepath, chinese_chars, status):
+    """Render one process_file result as report text."""
+    if chinese_chars is None:
+        return f"Skipping {filepath}: {status}"
+    return f"Processing {filepath}: {chinese_chars} Chinese characters found\n  {status}"
 
 if __name__ == "__main__":
-    files = [
-        "./modules/file_uploader.py",
-        "./modules/update_script.py",
-        "./README.md",
-        "./api_server.py",
-        "./id_updater.py",
-        "./TampermonkeyScript/LMArenaApiBridge.js",
-        "./model_updater.py",
-        "./file_bed_server/main.py"
-    ]
-    
-    for filepath in files:
-        process_file(filepath)
+    files = find_source_files(".")
+
+    load_scan_cache()
+    atexit.register(save_scan_cache)
+
+    # Scan concurrently, then write the whole report in one go and in file order
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        results = list(executor.map(process_file, files))
+    print("\n".join(format_result(*r) for r in results))